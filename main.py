@@ -1,12 +1,24 @@
 import os
+import sys
+import mmap
+import errno
 import shutil
 import threading
 import queue
 import binascii
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait
 import tkinter as tk
 from tkinter import filedialog, messagebox, ttk
 
 
+# 用户态拷贝缓冲区大小（1MB，兼顾缓存命中与系统调用次数）
+COPY_BUFFER_SIZE = 1024 ** 2
+# 并发拷贝分块的线程数（机械硬盘上过多并发会导致磁头来回寻道）
+COPY_WORKERS = 4
+# 每个拷贝线程各自复用一个读写缓冲区
+worker_buffers = threading.local()
+
+
 class FrameHeaderNotFoundError(Exception):
     """自定义异常：帧头未找到"""
 
@@ -15,7 +27,197 @@ class FrameHeaderNotFoundError(Exception):
         self.position = position
 
 
-def optimized_split(input_file, output_dir, frame_header, max_size_gb=1, progress_queue=None):
+def rfind_header(f, mm, frame_header, start, end):
+    """
+    在 [start, end) 区间内反向查找最后一个完整帧头，直接扫描页缓存，不复制数据
+    :param f: 已打开的输入文件
+    :param mm: 整个文件的内存映射，为空时只临时映射该区间
+    :param frame_header: 帧头（字节序列）
+    :param start: 区间起始偏移
+    :param end: 区间结束偏移
+    :return: 帧头在文件中的位置，未找到时返回 -1
+    """
+    # mmap.rfind 在C层实现：单字节帧头走 memrchr，多字节帧头走带跳转表的反向快速匹配，
+    # 与预编译 Boyer-Moore-Horspool 表等效；re 只能正向搜索，用在这里反而要枚举所有匹配
+    if mm is not None:
+        return mm.rfind(frame_header, start, end)
+
+    # 映射偏移必须按分配粒度对齐
+    map_offset = start - start % mmap.ALLOCATIONGRANULARITY
+    with mmap.mmap(f.fileno(), end - map_offset, access=mmap.ACCESS_READ, offset=map_offset) as window:
+        pos = window.rfind(frame_header, start - map_offset)
+    return pos + map_offset if pos != -1 else -1
+
+
+def copy_range(src, dest, start, length, src_pos=None, buf=None):
+    """
+    将源文件 [start, start + length) 区间的数据写入目标文件当前位置
+    优先使用内核零拷贝（copy_file_range / sendfile），不支持时退回到读写循环
+    :param src: 源文件（无缓冲二进制文件对象）
+    :param dest: 目标文件（无缓冲二进制文件对象）
+    :param start: 源文件起始偏移
+    :param length: 拷贝字节数
+    :param src_pos: 源文件当前读写位置（已知时传入，可省去一次 seek）
+    :param buf: 读写循环复用的缓冲区（memoryview），为空时临时分配
+    :return: 拷贝后源文件的读写位置
+    """
+    copied = 0
+
+    # 内核态拷贝：copy_file_range（Linux 4.5+，支持 NFS 服务端拷贝和 reflink），其次 sendfile
+    for syscall in ("copy_file_range", "sendfile"):
+        if copied >= length or not hasattr(os, syscall):
+            continue
+        try:
+            while copied < length:
+                if syscall == "copy_file_range":
+                    n = os.copy_file_range(src.fileno(), dest.fileno(), length - copied, start + copied)
+                else:
+                    n = os.sendfile(dest.fileno(), src.fileno(), start + copied, length - copied)
+                if n == 0:
+                    break
+                copied += n
+        except OSError as e:
+            # 文件系统或内核不支持时换下一种方式，其余错误（如磁盘已满）直接抛出
+            if e.errno not in (errno.ENOSYS, errno.EXDEV, errno.EINVAL,
+                               getattr(errno, "EOPNOTSUPP", None), getattr(errno, "ENOTSUP", None)):
+                raise
+
+    # 通用读写循环（Windows 等平台）
+    if copied < length:
+        if src_pos != start + copied:
+            src.seek(start + copied)
+        if buf is None:
+            buf = memoryview(bytearray(COPY_BUFFER_SIZE))
+        remaining = length - copied
+        while remaining > 0:
+            n = src.readinto(buf[:min(remaining, len(buf))])
+            if not n:
+                raise IOError(f"读取源文件失败: 位置 {start + length - remaining} 处数据不足")
+            view = buf[:n]
+            while view:
+                view = view[dest.write(view):]
+            remaining -= n
+        src_pos = start + length
+
+    # 内核态拷贝使用显式偏移，不改变源文件读写位置
+    return src_pos
+
+
+def remove_output(input_file, output_path):
+    """
+    删除已存在的输出文件，保证随后新建文件而不是原地覆盖
+    已有的输出可能是输入文件的硬链接（未分割时生成的 part_1.dat），以 'wb' 打开会截断输入文件
+    :param input_file: 输入文件路径
+    :param output_path: 输出文件路径
+    """
+    if not os.path.lexists(output_path):
+        return
+    # 输出路径就是输入文件本身（没有其他链接）时，删除会丢失输入文件
+    if os.path.samefile(input_file, output_path) and os.stat(output_path).st_nlink == 1:
+        raise IOError(f"输出文件与输入文件相同: {output_path}")
+    os.remove(output_path)
+
+
+def copy_part(input_file, output_path, start, end):
+    """
+    将输入文件 [start, end) 区间拷贝为一个分块文件，每次调用独立打开文件，可在线程池中并发执行
+    :param input_file: 输入文件路径
+    :param output_path: 分块文件路径
+    :param start: 起始偏移
+    :param end: 结束偏移
+    :return: 拷贝字节数
+    """
+    # Windows 没有 posix_fadvise；长度为0时表示整个文件，空分块不做提示
+    fadvise = hasattr(os, "posix_fadvise") and end > start
+
+    # 同一线程拷贝多个分块时只分配一次缓冲区
+    buf = getattr(worker_buffers, "buf", None)
+    if buf is None:
+        buf = worker_buffers.buf = memoryview(bytearray(COPY_BUFFER_SIZE))
+
+    # 先删除旧的输出再新建，避免通过硬链接截断输入文件
+    remove_output(input_file, output_path)
+
+    with open(input_file, 'rb', buffering=0) as src:
+        # 提示内核顺序读取该区间，加大预读窗口
+        if fadvise:
+            os.posix_fadvise(src.fileno(), start, end - start, os.POSIX_FADV_SEQUENTIAL)
+
+        with open(output_path, 'wb', buffering=0) as dest:
+            copy_range(src, dest, start, end - start, 0, buf)
+            # 分块写完后不再访问：立即启动回写并释放页缓存，避免挤占其他程序的缓存
+            if fadvise:
+                os.posix_fadvise(dest.fileno(), 0, end - start, os.POSIX_FADV_DONTNEED)
+
+        if fadvise:
+            os.posix_fadvise(src.fileno(), start, end - start, os.POSIX_FADV_DONTNEED)
+    return end - start
+
+
+def find_parts(input_file, frame_header, max_size, frame_size=None):
+    """
+    按帧头逐个查找分割点，每找到一个就立即产出对应的分块区间
+    :param input_file: 输入文件路径
+    :param frame_header: 自定义帧头（字节序列）
+    :param max_size: 单文件最大字节数
+    :param frame_size: 固定帧长（字节），已知时按整帧数直接计算分割点
+    :return: 生成器，依次产出 (起始偏移, 结束偏移)
+    """
+    HEADER_LEN = len(frame_header)
+    SEARCH_SPAN = HEADER_LEN * 100  # 分割点前的搜索范围（整个任务内不变）
+
+    file_size = os.path.getsize(input_file)
+    current_position = 0
+
+    # 文件只用于内存映射和预读提示，从不经由 read() 读取，无需用户态缓冲区
+    with open(input_file, 'rb', buffering=0) as f:
+        # 64位进程一次性映射整个文件；32位进程地址空间不足以容纳大文件，按搜索窗口临时映射
+        mm = None
+        if sys.maxsize > 2 ** 32 and file_size > max_size:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            # 只访问分割点附近的零散窗口，关闭顺序预读
+            if hasattr(mm, "madvise") and hasattr(mmap, "MADV_RANDOM"):
+                mm.madvise(mmap.MADV_RANDOM)
+
+        try:
+            while current_position + max_size < file_size:
+                # 计算下一个分割点（当前+1GB）
+                next_target = current_position + max_size
+
+                # 固定帧长时按整帧数直接算出分割点，只需校验该处确为帧头
+                header_pos = -1
+                if frame_size:
+                    fixed_pos = current_position + (max_size // frame_size) * frame_size
+                    fixed_end = min(file_size, fixed_pos + HEADER_LEN)
+                    if fixed_pos > current_position and rfind_header(f, mm, frame_header, fixed_pos, fixed_end) == fixed_pos:
+                        header_pos = fixed_pos
+
+                # 帧长未知或校验失败时，在分割点前的窗口内搜索
+                if header_pos == -1:
+                    # 创建向前搜索窗口（确保不超过文件起始位置）
+                    search_start = max(0, next_target - SEARCH_SPAN)
+                    # 只读到分割点处帧头的末尾，窗口外的帧头不会被采用
+                    search_end = min(file_size, next_target + HEADER_LEN)
+
+                    # 在窗口内从分割点反向搜索，只需要分割点前（含）最后一个帧头
+                    header_pos = rfind_header(f, mm, frame_header, search_start, search_end)
+
+                # 确保找到有效的帧头位置，未找到时抛出异常
+                if header_pos == -1 or header_pos <= current_position:
+                    raise FrameHeaderNotFoundError(next_target)
+
+                yield current_position, header_pos
+                current_position = header_pos
+        finally:
+            if mm is not None:
+                mm.close()
+
+    # 最后一块延伸到文件末尾
+    yield current_position, file_size
+
+
+def optimized_split(input_file, output_dir, frame_header, max_size_gb=1, progress_queue=None, frame_size=None,
+                    size_warnings=None):
     """
     高性能文件分割方案（支持自定义帧头）
     :param input_file: 输入文件路径
@@ -23,9 +225,10 @@ def optimized_split(input_file, output_dir, frame_header, max_size_gb=1, progres
     :param frame_header: 自定义帧头（字节序列）
     :param max_size_gb: 单文件最大GB数
     :param progress_queue: 进度队列（用于跨线程通信）
+    :param frame_size: 固定帧长（字节），为空时搜索帧头确定分割点
+    :param size_warnings: 收集超出大小限制的警告信息（列表），由调用方在任务结束后统一提示
     """
     # 基础参数设置
-    HEADER_LEN = len(frame_header)
     max_size = int(max_size_gb * 1024 ** 3)  # 转换为字节
 
     # 创建输出目录
@@ -35,92 +238,82 @@ def optimized_split(input_file, output_dir, frame_header, max_size_gb=1, progres
     file_size = os.path.getsize(input_file)
     total_processed = 0
 
-    # 存储实际分割位置
-    actual_splits = [0]
-    current_position = 0
-
-    # 步骤1：动态计算分割点
-    with open(input_file, 'rb') as f:
-        while current_position + max_size < file_size:
-            # 计算下一个分割点（当前+1GB）
-            next_target = current_position + max_size
-
-            # 创建向前搜索窗口（确保不超过文件起始位置）
-            search_start = max(0, next_target - HEADER_LEN * 100)  # 扩大搜索范围
-            search_end = min(file_size, next_target + HEADER_LEN * 2)
-
-            # 定位到搜索区域
-            f.seek(search_start)
-            search_data = f.read(search_end - search_start)
-
-            # 在窗口内向前搜索帧头
-            last_valid_header = None
-            pos = 0
-            while pos < len(search_data):
-                # 查找帧头位置
-                header_pos = search_data.find(frame_header, pos)
-                if header_pos == -1:
-                    break
-
-                # 计算全局位置
-                global_pos = search_start + header_pos
-
-                # 只保留在分割点前的帧头位置
-                if global_pos <= next_target:
-                    last_valid_header = global_pos
-                else:
-                    # 如果找到的帧头已经超过目标点，停止搜索
-                    break
-
-                # 移动到下一个位置
-                pos = header_pos + HEADER_LEN
-
-            # 确保找到有效的帧头位置
-            if last_valid_header is not None and last_valid_header > current_position:
-                actual_splits.append(last_valid_header)
-                current_position = last_valid_header
-            else:
-                # 未找到有效帧头时，抛出异常
-                raise FrameHeaderNotFoundError(next_target)
-
-            # 更新进度
-            total_processed = current_position
-            if progress_queue:
-                progress_queue.put(int(total_processed / file_size * 100))
-
-    actual_splits.append(file_size)  # 添加文件结束点
-
-    # 步骤2：直接拷贝数据块
-    part_num = 1
-    for i in range(len(actual_splits) - 1):
-        start = actual_splits[i]
-        end = actual_splits[i + 1]
-        file_size_bytes = end - start
-
-        # 检查文件大小是否超过限制
-        if file_size_bytes > max_size:
-            messagebox.showwarning("警告",
-                                   f"文件块 {part_num} 大小超出限制: {file_size_bytes / (1024 ** 2):.2f}MB > {max_size_gb}GB")
-
-        output_path = os.path.join(output_dir, f"part_{part_num}.dat")
-        part_num += 1
-
-        # 使用系统级拷贝加速
-        with open(input_file, 'rb') as src:
-            with open(output_path, 'wb') as dest:
-                src.seek(start)
-                remaining = end - start
-                while remaining > 0:
-                    chunk_size = min(remaining, 100 * 1024 ** 2)  # 100MB块
-                    dest.write(src.read(chunk_size))
-                    remaining -= chunk_size
-
-        # 更新进度
-        total_processed = end
-        if progress_queue:
-            progress_queue.put(int(total_processed / file_size * 100))
-
-    return part_num - 1  # 返回生成文件数
+    # 进度只在百分比变化时入队，避免频繁上报阻塞工作线程、反复刷新界面
+    last_progress = -1
+
+    def report_progress(done):
+        nonlocal last_progress
+        progress = int(done / file_size * 100) if file_size else 100
+        if progress_queue and progress != last_progress:
+            progress_queue.put(progress)
+            last_progress = progress
+
+    # 文件不超过单文件大小时无需分割：同一文件系统内直接建立硬链接，不拷贝任何数据；
+    # 跨盘、FAT/exFAT 等不支持硬链接时由 copyfile 完成，其内部使用 sendfile 等系统级拷贝
+    if file_size <= max_size:
+        output_path = os.path.join(output_dir, "part_1.dat")
+
+        # 重复执行时输出已是输入文件的硬链接，无需任何操作
+        if not (os.path.exists(output_path) and os.path.samefile(input_file, output_path)):
+            # 先链接到临时文件名再替换，目标已存在时同样生效
+            temp_path = output_path + ".tmp"
+            try:
+                if os.path.exists(temp_path):
+                    os.remove(temp_path)
+                os.link(input_file, temp_path)
+                os.replace(temp_path, output_path)
+            except OSError:
+                if os.path.lexists(temp_path):
+                    os.remove(temp_path)
+                # 旧的输出可能是另一个输入文件的硬链接，先删除再拷贝，避免覆盖该文件
+                remove_output(input_file, output_path)
+                shutil.copyfile(input_file, output_path)
+
+        report_progress(file_size)
+        return 1
+
+    # 边查找分割点边拷贝：每找到一个分割点立即提交该分块的拷贝任务，不再先保存全部分割点
+    # 各分块互不重叠，多线程并发拷贝以提高磁盘队列深度（系统调用期间释放GIL）
+    part_num = 0
+    futures = []
+    output_paths = []
+    with ThreadPoolExecutor(max_workers=COPY_WORKERS) as executor:
+        try:
+            for start, end in find_parts(input_file, frame_header, max_size, frame_size):
+                part_num += 1
+                file_size_bytes = end - start
+
+                # 检查文件大小是否超过限制（后台线程中不能直接弹窗，先记录下来）
+                if file_size_bytes > max_size and size_warnings is not None:
+                    size_warnings.append(
+                        f"文件块 {part_num} 大小超出限制: {file_size_bytes / (1024 ** 2):.2f}MB > {max_size_gb}GB")
+
+                output_path = os.path.join(output_dir, f"part_{part_num}.dat")
+                futures.append(executor.submit(copy_part, input_file, output_path, start, end))
+                output_paths.append(output_path)
+
+            for future in as_completed(futures):
+                # 更新进度
+                total_processed += future.result()
+                report_progress(total_processed)
+        except Exception:
+            # 查找分割点或任一分块拷贝失败时，取消尚未开始的拷贝
+            for future in futures:
+                future.cancel()
+            wait(futures)
+
+            # 删除本次已写出的分块，避免留下看似完整、实则不全的结果
+            for future, output_path in zip(futures, output_paths):
+                if not future.cancelled():
+                    try:
+                        # 输出路径就是输入文件时（见 remove_output）不能删除
+                        if not os.path.samefile(input_file, output_path):
+                            os.remove(output_path)
+                    except OSError:
+                        pass
+            raise
+
+    return part_num  # 返回生成文件数
 
 
 def hex_to_bytes(hex_str):
@@ -154,10 +347,12 @@ def browse_output_dir(entry_widget):
         entry_widget.insert(0, output_dir)
 
 
-def start_processing(input_entry, output_entry, header_entry, max_size_entry, progress_var, status_label):
+def start_processing(input_entry, output_entry, header_entry, max_size_entry, frame_size_entry, progress_var,
+                     status_label):
     input_file = input_entry.get()
     output_dir = output_entry.get()
     header_text = header_entry.get()
+    frame_size_text = frame_size_entry.get().strip()
 
     try:
         max_size_gb = float(max_size_entry.get())
@@ -167,6 +362,17 @@ def start_processing(input_entry, output_entry, header_entry, max_size_entry, pr
         messagebox.showerror("错误", "请输入有效的文件大小（大于0的数字）")
         return
 
+    # 帧长度为可选项，留空时按帧头搜索分割点
+    frame_size = None
+    if frame_size_text:
+        try:
+            frame_size = int(frame_size_text)
+            if frame_size <= 0:
+                raise ValueError("帧长度必须大于0")
+        except ValueError:
+            messagebox.showerror("错误", "请输入有效的帧长度（大于0的整数）")
+            return
+
     # 验证输入
     if not input_file or not output_dir or not header_text:
         messagebox.showerror("错误", "请填写所有必填字段！")
@@ -186,6 +392,8 @@ def start_processing(input_entry, output_entry, header_entry, max_size_entry, pr
 
     # 创建进度队列（用于线程间通信）
     progress_queue = queue.Queue()
+    # 分块大小警告，任务结束后统一显示
+    size_warnings = []
 
     # 创建后台线程执行分割任务
     def run_split_task():
@@ -196,8 +404,12 @@ def start_processing(input_entry, output_entry, header_entry, max_size_entry, pr
                 output_dir,
                 frame_header,
                 max_size_gb,
-                progress_queue
+                progress_queue,
+                frame_size,
+                size_warnings
             )
+            if size_warnings:
+                root.after(0, lambda: messagebox.showwarning("警告", "\n".join(size_warnings)))
             root.after(0, lambda: status_label.config(text=f"处理完成！共生成 {num_files} 个文件。"))
             root.after(0, lambda: messagebox.showinfo("完成", f"文件分割完成！共生成 {num_files} 个文件。"))
         except FrameHeaderNotFoundError as e:
@@ -214,13 +426,16 @@ def start_processing(input_entry, output_entry, header_entry, max_size_entry, pr
 
     # 定期检查进度队列并更新UI
     def update_progress_bar():
+        # 取出所有积压的进度，只按最新值刷新一次界面
+        progress_value = None
         try:
-            while not progress_queue.empty():
+            while True:
                 progress_value = progress_queue.get_nowait()
-                progress_var.set(progress_value)
-                status_label.config(text=f"处理中... {progress_value}%")
         except queue.Empty:
             pass
+        if progress_value is not None:
+            progress_var.set(progress_value)
+            status_label.config(text=f"处理中... {progress_value}%")
         root.after(100, update_progress_bar)  # 每100毫秒检查一次
 
     # 初始化进度条和状态
@@ -232,7 +447,7 @@ def start_processing(input_entry, output_entry, header_entry, max_size_entry, pr
 # 创建主窗口
 root = tk.Tk()
 root.title("高性能文件分割助手 (智联电子数据记录仪专用)")
-root.geometry("700x400")
+root.geometry("700x450")
 
 # 使用Frame容器组织界面
 main_frame = tk.Frame(root, padx=20, pady=20)
@@ -272,6 +487,14 @@ max_size_entry.pack(side=tk.LEFT, padx=5)
 max_size_entry.insert(0, "1")  # 默认1GB
 tk.Label(size_frame, text="(单个文件的最大大小)").pack(side=tk.LEFT)
 
+# 固定帧长度设置（可选）
+frame_size_frame = tk.Frame(main_frame)
+frame_size_frame.pack(fill=tk.X, pady=10)
+tk.Label(frame_size_frame, text="帧长度(字节):", width=15, anchor="w").pack(side=tk.LEFT)
+frame_size_entry = tk.Entry(frame_size_frame, width=10)
+frame_size_entry.pack(side=tk.LEFT, padx=5)
+tk.Label(frame_size_frame, text="(可选，帧长固定时填写，可跳过帧头搜索)").pack(side=tk.LEFT)
+
 # 进度条
 progress_frame = tk.Frame(main_frame)
 progress_frame.pack(fill=tk.X, pady=15)
@@ -290,7 +513,8 @@ button_frame = tk.Frame(main_frame)
 button_frame.pack(pady=20)
 tk.Button(button_frame, text="开始分割",
           command=lambda: start_processing(
-              input_entry, output_entry, header_entry, max_size_entry, progress_var, status_label),
+              input_entry, output_entry, header_entry, max_size_entry, frame_size_entry, progress_var,
+              status_label),
           width=20, height=2, bg="#4CAF50", fg="white").pack()
 
 root.mainloop()
\ No newline at end of file